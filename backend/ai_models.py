@@ -2,44 +2,278 @@
 AI Models for Audio and Video Analysis
 """
 
+import queue
+import threading
+import time
 import torch
 import numpy as np
-from transformers import (
-    Wav2Vec2Processor,
-    Wav2Vec2ForSequenceClassification,
-    ViTImageProcessor,
-    ViTForImageClassification
-)
-from typing import List, Dict
-import warnings
+from concurrent.futures import Future
+from typing import Any, Callable, List, Dict, Optional, Tuple
 
-warnings.filterwarnings("ignore")
+from registry import COMPILE_MODELS, get_device, get_dtype, get_audio_model, get_video_model
+
+# Fixed input shapes captured as CUDA graphs, or compiled with torch.compile.
+# Audio has no length buckets: Wav2Vec2 runs unmasked, so clips can't be padded
+AUDIO_WARMUP_SAMPLES = 16000 * 5  # 5 s at 16 kHz
+AUDIO_BATCH_BUCKETS = (1, 2, 4, 8)  # clips per batch (torch.compile only)
+VIDEO_BATCH_BUCKETS = (4, 8, 16, 20)  # frames per batch
+
+# Frames sampled evenly across a video for analysis
+VIDEO_SAMPLE_FRAMES = 20
+
+# Cross-request micro-batching
+BATCH_MAX_REQUESTS = 8
+BATCH_MAX_WAIT_MS = 10
+
+
+def _select_bucket(size: int, buckets: Tuple[int, ...]) -> Optional[int]:
+    """Return the smallest bucket that fits size, or None if it exceeds every bucket"""
+    for bucket in buckets:
+        if size <= bucket:
+            return bucket
+    return None
+
+
+def _padded_size(size: int, buckets: Tuple[int, ...]) -> int:
+    """Return the smallest bucket that fits size, else the next multiple of the largest"""
+    bucket = _select_bucket(size, buckets)
+    if bucket is None:
+        bucket = -(-size // buckets[-1]) * buckets[-1]
+    return bucket
+
+
+def upload(host: torch.Tensor, device: torch.device, copy_stream=None) -> torch.Tensor:
+    """
+    Copy a host tensor to device
+    
+    On CUDA the copy is issued non-blocking on copy_stream (host should be
+    pinned) and the current stream is made to wait for it.
+    """
+    if device.type != "cuda":
+        return host.to(device)
+    
+    with torch.cuda.stream(copy_stream):
+        tensor = host.to(device, non_blocking=True)
+    torch.cuda.current_stream().wait_stream(copy_stream)
+    tensor.record_stream(torch.cuda.current_stream())
+    return tensor
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into batched model calls
+    
+    A background thread takes the first queued item, collects up to
+    max_batch - 1 more that are already queued or arrive within max_wait_ms
+    (0 = never wait), and passes them to batch_fn as one list. batch_fn
+    returns one result per item, which is delivered to that item's Future. All model work for an analyzer runs on
+    this one thread, so its graph and staging buffers are never shared.
+    on_start, if given, runs on that thread before the first batch (e.g.
+    warm-up that must record per-thread state); items submitted meanwhile wait.
+    """
+    
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        max_batch: int = BATCH_MAX_REQUESTS,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+        on_start: Optional[Callable[[], None]] = None
+    ):
+        self.batch_fn = batch_fn
+        self.on_start = on_start
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def submit(self, item: Any) -> Future:
+        """Queue an item; the returned Future resolves to its result"""
+        future = Future()
+        self.queue.put((item, future))
+        return future
+    
+    def _run(self):
+        if self.on_start is not None:
+            try:
+                self.on_start()
+            except Exception as e:
+                print(f"Warning: Batcher start-up failed: {e}")
+        
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    if timeout > 0:
+                        batch.append(self.queue.get(timeout=timeout))
+                    else:
+                        # Past the deadline, still take items that are already queued
+                        batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = self.batch_fn(items)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            
+            for future, result in zip(futures, results):
+                future.set_result(result)
+
+
+class CUDAGraphRunner:
+    """Model forward pass captured as a CUDA graph for one fixed input shape"""
+    
+    def __init__(self, model, shape: Tuple[int, ...], dtype, device, pool=None):
+        self.static_input = torch.zeros(shape, dtype=dtype, device=device)
+        
+        # Warm up on a side stream so lazy initialization is not captured
+        stream = torch.cuda.Stream()
+        stream.wait_stream(torch.cuda.current_stream())
+        with torch.cuda.stream(stream), torch.no_grad():
+            for _ in range(3):
+                model(self.static_input)
+        torch.cuda.current_stream().wait_stream(stream)
+        
+        self.graph = torch.cuda.CUDAGraph()
+        with torch.no_grad(), torch.cuda.graph(self.graph, pool=pool):
+            self.static_output = model(self.static_input)
+    
+    def __call__(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Replay the graph on x, zero-padded up to the captured shape
+        
+        The returned logits live in a static buffer that the next replay
+        overwrites, so read them before running the model again.
+        """
+        self.static_input.zero_()
+        self.static_input[tuple(slice(0, size) for size in x.shape)].copy_(x)
+        self.graph.replay()
+        return self.static_output
 
 
 class AudioAnalyzer:
     """Wav2Vec2 model for audio deepfake detection"""
     
     def __init__(self):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"AudioAnalyzer using device: {self.device}")
+        self.device = get_device()
+        self.dtype = get_dtype()
         
-        # Load pre-trained model
-        model_name = "facebook/wav2vec2-base-960h"
+        self.processor = None
+        self.batcher = None
+        self.copy_stream = torch.cuda.Stream() if self.device.type == "cuda" else None
         
+        # Model is loaded on first use
+        self._model = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """Wav2Vec2 logits model, loaded on first access (None if unavailable)"""
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+        return self._model
+    
+    def _load(self):
         try:
-            self.processor = Wav2Vec2Processor.from_pretrained(model_name)
-            self.model = Wav2Vec2ForSequenceClassification.from_pretrained(
-                model_name,
-                num_labels=2  # Real vs Fake
+            self.processor, self._model = get_audio_model()
+            self.do_normalize = self.processor.feature_extractor.do_normalize
+            # torch.compile's CUDA graphs are per thread, so warm up on the batcher's.
+            # Only equal-length clips can share a pass, which uploads almost never
+            # are, so don't hold requests waiting for companions (max_wait_ms=0);
+            # already-queued clips are still drained together
+            self.batcher = MicroBatcher(
+                self._predict_batch,
+                max_wait_ms=0,
+                on_start=self._warmup if COMPILE_MODELS else None
             )
-            self.model.to(self.device)
-            self.model.eval()
             print("AudioAnalyzer model loaded successfully")
         except Exception as e:
             print(f"Warning: Could not load full model: {e}")
             print("Using mock model for demonstration")
             self.processor = None
-            self.model = None
+            self._model = None
+    
+    def _predict_batch(self, clips: List[np.ndarray]) -> List[float]:
+        """
+        Score clips from concurrent requests, one forward pass per clip length
+        
+        Args:
+            clips: Audio sample arrays at 16 kHz
+            
+        Returns:
+            Confidence (probability of being real, 0-100) for each clip
+        """
+        # Wav2Vec2 gets no attention mask, so padding would change the scores;
+        # only clips of identical length share a forward pass
+        groups: Dict[int, List[int]] = {}
+        for i, clip in enumerate(clips):
+            groups.setdefault(len(clip), []).append(i)
+        
+        confidences = [None] * len(clips)
+        results = []
+        for length, indices in groups.items():
+            results.append((indices, self._predict_group([clips[i] for i in indices], length)))
+        
+        # Read results back only once every group's work is queued
+        for indices, group_confidences in results:
+            for i, confidence in zip(indices, group_confidences.tolist()):
+                confidences[i] = confidence
+        return confidences
+    
+    def _predict_group(self, clips: List[np.ndarray], length: int) -> torch.Tensor:
+        """
+        Run one forward pass over clips that all have the same length
+        
+        Args:
+            clips: Audio sample arrays at 16 kHz, each length samples long
+            length: Number of samples per clip
+            
+        Returns:
+            Device tensor of confidences (probability of being real, 0-100)
+        """
+        rows = len(clips)
+        if COMPILE_MODELS:
+            # Fixed batch sizes keep torch.compile from specializing per request
+            rows = _padded_size(rows, AUDIO_BATCH_BUCKETS)
+        
+        host = torch.zeros(
+            (rows, length),
+            dtype=torch.float32,
+            pin_memory=self.device.type == "cuda"
+        )
+        for i, clip in enumerate(clips):
+            host[i] = torch.from_numpy(np.ascontiguousarray(clip, dtype=np.float32))
+        x = upload(host, self.device, self.copy_stream)
+        
+        # Normalize each clip to zero mean and unit variance, as the processor does
+        if self.do_normalize:
+            mean = x.mean(dim=1, keepdim=True)
+            var = x.var(dim=1, unbiased=False, keepdim=True)
+            x = (x - mean) / torch.sqrt(var + 1e-7)
+        input_values = x.to(self.dtype)
+        
+        # No CUDA graph replay: clip lengths vary freely and can't be padded
+        with torch.inference_mode():
+            logits = self._model(input_values).float()
+            probabilities = torch.softmax(logits, dim=-1)
+        
+        return probabilities[:len(clips), 0] * 100
+    
+    def _warmup(self):
+        """Compile the length-generic graph for every batch bucket before serving requests"""
+        for rows in AUDIO_BATCH_BUCKETS:
+            self._predict_batch([np.zeros(AUDIO_WARMUP_SAMPLES, dtype=np.float32)] * rows)
     
     def analyze(self, audio_data: np.ndarray) -> Dict:
         """
@@ -56,24 +290,8 @@ class AudioAnalyzer:
             return self._mock_analysis(audio_data)
         
         try:
-            # Process audio
-            inputs = self.processor(
-                audio_data,
-                sampling_rate=16000,
-                return_tensors="pt",
-                padding=True
-            )
-            
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            # Get predictions
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                logits = outputs.logits
-                probabilities = torch.softmax(logits, dim=-1)
-            
-            # Extract confidence (probability of being real)
-            confidence = float(probabilities[0][0].cpu().numpy() * 100)
+            # Batched with any concurrent requests (probability of being real)
+            confidence = self.batcher.submit(audio_data).result()
             
             return {
                 "confidence": confidence,
@@ -92,8 +310,11 @@ class AudioAnalyzer:
     def _mock_analysis(self, audio_data: np.ndarray) -> Dict:
         """Mock analysis for demonstration purposes"""
         # Simulate analysis based on audio characteristics
-        mean_amplitude = np.abs(audio_data).mean()
-        std_amplitude = np.abs(audio_data).std()
+        # (std of |x| from the first two moments, since |x|^2 == x^2)
+        n = audio_data.size
+        mean_amplitude = np.abs(audio_data).sum() / n
+        mean_square = float(np.dot(audio_data, audio_data)) / n
+        std_amplitude = np.sqrt(max(mean_square - mean_amplitude ** 2, 0.0))
         
         # Simple heuristic for demonstration
         confidence = min(100, (mean_amplitude * 1000 + std_amplitude * 100) % 100)
@@ -114,33 +335,146 @@ class VideoAnalyzer:
     """Vision Transformer for video frame analysis"""
     
     def __init__(self):
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        print(f"VideoAnalyzer using device: {self.device}")
+        self.device = get_device()
+        self.dtype = get_dtype()
         
-        # Load pre-trained model
-        model_name = "google/vit-base-patch16-224"
+        self.processor = None
+        self.graphs = {}
+        self.batcher = None
+        self.copy_stream = torch.cuda.Stream() if self.device.type == "cuda" else None
         
+        # Model is loaded on first use
+        self._model = None
+        self._loaded = False
+        self._load_lock = threading.Lock()
+    
+    @property
+    def model(self):
+        """ViT logits model, loaded on first access (None if unavailable)"""
+        if not self._loaded:
+            with self._load_lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+        return self._model
+    
+    def _load(self):
         try:
-            self.processor = ViTImageProcessor.from_pretrained(model_name)
-            self.model = ViTForImageClassification.from_pretrained(
-                model_name,
-                num_labels=2  # Real vs Fake
+            self.processor, self._model = get_video_model()
+            self.image_size = (self.processor.size["height"], self.processor.size["width"])
+            self.image_mean = torch.tensor(self.processor.image_mean, device=self.device).view(1, 3, 1, 1)
+            self.image_std = torch.tensor(self.processor.image_std, device=self.device).view(1, 3, 1, 1)
+            
+            # Reusable host staging buffer for frame batches (pinned on CUDA)
+            self.staging = torch.empty(
+                (BATCH_MAX_REQUESTS * max(VIDEO_BATCH_BUCKETS), *self.image_size, 3),
+                dtype=torch.uint8,
+                pin_memory=self.device.type == "cuda"
+            )
+            self.graphs = self._capture_graphs()
+            # torch.compile's CUDA graphs are per thread, so warm up on the batcher's
+            self.batcher = MicroBatcher(
+                self._predict_batch,
+                on_start=self._warmup if COMPILE_MODELS else None
             )
-            self.model.to(self.device)
-            self.model.eval()
             print("VideoAnalyzer model loaded successfully")
         except Exception as e:
             print(f"Warning: Could not load full model: {e}")
             print("Using mock model for demonstration")
             self.processor = None
-            self.model = None
+            self._model = None
+    
+    def _capture_graphs(self) -> Dict[int, CUDAGraphRunner]:
+        """Capture one CUDA graph per frame batch bucket (GPU only)"""
+        if self.device.type != "cuda" or COMPILE_MODELS:
+            # reduce-overhead compilation already replays CUDA graphs
+            return {}
+        
+        try:
+            pool = torch.cuda.graph_pool_handle()
+            return {
+                bucket: CUDAGraphRunner(
+                    self._model, (bucket, 3, *self.image_size), self.dtype, self.device, pool
+                )
+                for bucket in VIDEO_BATCH_BUCKETS
+            }
+        except Exception as e:
+            print(f"Warning: Could not capture CUDA graphs: {e}")
+            return {}
+    
+    def _preprocess(self, frames: List[np.ndarray]) -> torch.Tensor:
+        """
+        Resize and normalize frames into a ViT pixel_values batch
+        
+        Equivalent to ViTImageProcessor (bilinear resize, rescale, normalize),
+        but frames are resized into one contiguous (N, H, W, 3) uint8 buffer
+        that is uploaded once and normalized on the model device.
+        """
+        import cv2  # deferred so worker boot doesn't load OpenCV
+        
+        height, width = self.image_size
+        batch = self.staging[:len(frames)]
+        batch_np = batch.numpy()
+        for i, frame in enumerate(frames):
+            cv2.resize(frame, (width, height), dst=batch_np[i], interpolation=cv2.INTER_LINEAR)
+        
+        pixel_values = upload(batch, self.device, self.copy_stream)
+        pixel_values = pixel_values.permute(0, 3, 1, 2).float().div_(255)
+        pixel_values = (pixel_values - self.image_mean) / self.image_std
+        return pixel_values.to(self.dtype)
+    
+    def _predict_batch(self, frame_sets: List[np.ndarray]) -> List[float]:
+        """
+        Run one forward pass over the sampled frames of concurrent requests
+        
+        Args:
+            frame_sets: Sampled (N, H, W, 3) uint8 RGB frames for each request
+            
+        Returns:
+            Average confidence (0-100) for each request
+        """
+        counts = [len(frames) for frames in frame_sets]
+        num_frames = sum(counts)
+        pixel_values = self._preprocess([frame for frames in frame_sets for frame in frames])
+        
+        if COMPILE_MODELS:
+            # Fixed shapes keep torch.compile from specializing per request
+            padding = _padded_size(num_frames, VIDEO_BATCH_BUCKETS) - num_frames
+            pixel_values = torch.cat([pixel_values, pixel_values.new_zeros(padding, *pixel_values.shape[1:])])
+        
+        # Replay a captured graph when the batch fits a bucket
+        runner = self.graphs.get(_select_bucket(num_frames, VIDEO_BATCH_BUCKETS))
+        
+        with torch.inference_mode():
+            if runner is not None:
+                logits = runner(pixel_values)[:num_frames].float()
+            else:
+                logits = self._model(pixel_values)[:num_frames].float()
+            probabilities = torch.softmax(logits, dim=-1)
+        
+        # One host sync reads every frame confidence (at most a few hundred
+        # floats); averaging them per request is then cheap on the host
+        frame_confidences = (probabilities[:, 0] * 100).tolist()
+        averages = []
+        start = 0
+        for count in counts:
+            averages.append(sum(frame_confidences[start:start + count]) / count)
+            start += count
+        return averages
+    
+    def _warmup(self):
+        """Compile every bucketed input shape before serving requests"""
+        largest = max(VIDEO_BATCH_BUCKETS)
+        sizes = list(VIDEO_BATCH_BUCKETS) + list(range(2 * largest, BATCH_MAX_REQUESTS * largest + 1, largest))
+        for size in sizes:
+            self._predict_batch([np.zeros((size, *self.image_size, 3), dtype=np.uint8)])
     
-    def analyze(self, frames: List[np.ndarray]) -> Dict:
+    def analyze(self, frames: np.ndarray) -> Dict:
         """
         Analyze video frames for deepfake detection
         
         Args:
-            frames: List of video frames as numpy arrays
+            frames: (N, H, W, 3) uint8 RGB frames from extract_video_frames
             
         Returns:
             Dictionary with confidence score and features
@@ -150,31 +484,11 @@ class VideoAnalyzer:
             return self._mock_analysis(frames)
         
         try:
-            confidences = []
-            
-            # Analyze subset of frames (every 5th frame for efficiency)
-            sample_frames = frames[::5][:20]  # Max 20 frames
-            
-            for frame in sample_frames:
-                # Process frame
-                inputs = self.processor(
-                    images=frame,
-                    return_tensors="pt"
-                )
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                
-                # Get predictions
-                with torch.no_grad():
-                    outputs = self.model(**inputs)
-                    logits = outputs.logits
-                    probabilities = torch.softmax(logits, dim=-1)
-                
-                # Extract confidence
-                frame_confidence = float(probabilities[0][0].cpu().numpy() * 100)
-                confidences.append(frame_confidence)
+            # Frames are already sampled evenly across the video at decode time
+            sample_frames = frames[:VIDEO_SAMPLE_FRAMES]
             
-            # Average confidence across frames
-            avg_confidence = np.mean(confidences)
+            # Batched with any concurrent requests
+            avg_confidence = self.batcher.submit(sample_frames).result()
             
             return {
                 "confidence": float(avg_confidence),
@@ -191,7 +505,7 @@ class VideoAnalyzer:
             print(f"Video analysis error: {e}")
             return self._mock_analysis(frames)
     
-    def _mock_analysis(self, frames: List[np.ndarray]) -> Dict:
+    def _mock_analysis(self, frames: np.ndarray) -> Dict:
         """Mock analysis for demonstration purposes"""
         if len(frames) == 0:
             return {
@@ -206,8 +520,8 @@ class VideoAnalyzer:
             }
         
         # Simulate analysis based on frame characteristics
-        frame_variances = [frame.std() for frame in frames[::5][:20]]
-        avg_variance = np.mean(frame_variances)
+        frame_variances = np.stack(frames[:VIDEO_SAMPLE_FRAMES]).std(axis=(1, 2, 3))
+        avg_variance = frame_variances.mean()
         
         # Simple heuristic for demonstration
         confidence = min(100, (avg_variance * 2) % 100)
@@ -217,7 +531,7 @@ class VideoAnalyzer:
             "confidence": float(confidence),
             "is_authentic": confidence > 50,
             "model": "vision-transformer-mock",
-            "frames_analyzed": min(len(frames), 20),
+            "frames_analyzed": min(len(frames), VIDEO_SAMPLE_FRAMES),
             "features": {
                 "face_consistency": min(confidence + 8, 100),
                 "temporal_coherence": min(confidence + 12, 100)
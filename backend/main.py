@@ -3,20 +3,22 @@ Echo-Check Backend - main.py
 FastAPI application for deepfake detection
 """
 
-from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, status
+from fastapi import FastAPI, File, UploadFile, Depends, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor
 import uvicorn
 import os
+import time
 import shutil
 from pathlib import Path
 
 # Local imports (we'll create these files)
-from database import engine, Base, get_db
+from database import engine, Base, SessionLocal, get_db
 from models import User, AnalysisHistory
 from schemas import UserCreate, UserLogin, Token, AnalysisResponse, HistoryResponse
 from auth import (
@@ -26,8 +28,10 @@ from auth import (
     get_current_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from ai_models import AudioAnalyzer, VideoAnalyzer
+from ai_models import AudioAnalyzer, VideoAnalyzer, VIDEO_SAMPLE_FRAMES
 from utils import (
+    FileTooLargeError,
+    is_supported_media,
     save_upload_file,
     extract_audio_features,
     extract_video_frames,
@@ -40,14 +44,41 @@ from utils import (
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+# create_all skips existing tables, so add any new indexes explicitly
+for index in AnalysisHistory.__table__.indexes:
+    index.create(bind=engine, checkfirst=True)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Echo-Check API",
     description="Intelligent Deepfake Detection System",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-# CORS configuration
+# Upload limits
+ALLOWED_EXTENSIONS = frozenset({".mp3", ".mp4", ".wav", ".m4a"})
+VIDEO_EXTENSIONS = frozenset({".mp4"})
+UNSUPPORTED_TYPE_DETAIL = f"File type not supported. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}"
+MAX_UPLOAD_SIZE = 100 * 1024 * 1024  # 100MB
+MULTIPART_OVERHEAD = 64 * 1024  # allowance for form boundaries and headers
+
+
+@app.middleware("http")
+async def reject_oversized_uploads(request: Request, call_next):
+    """Reject oversized uploads from Content-Length before the body is read"""
+    if request.url.path == "/upload":
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and \
+                int(content_length) > MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD:
+            return ORJSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": "File size exceeds 100MB limit"}
+            )
+    return await call_next(request)
+
+
+# CORS configuration (added last so it is outermost and also covers early 413s)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173", "http://localhost:3000"],
@@ -68,9 +99,40 @@ for directory in [UPLOAD_DIR, MODELS_DIR, SPECTROGRAMS_DIR]:
 audio_analyzer = AudioAnalyzer()
 video_analyzer = VideoAnalyzer()
 
+# Worker pool for analyses, so uploads don't block the event loop; sized so
+# concurrent analyses can fill a model micro-batch
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "8"))
+analysis_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS, thread_name_prefix="analysis")
+
+# Decoding and spectrogram rendering, overlapped with model inference
+io_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS * 2, thread_name_prefix="analysis-io")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 
+@app.on_event("startup")
+def fail_interrupted_analyses():
+    """Mark analyses left queued/processing by a previous run as failed"""
+    # Jobs live only in this process's executor and the upload path isn't
+    # stored, so they can't be resumed; failing them stops clients polling
+    db = SessionLocal()
+    try:
+        stale = db.query(AnalysisHistory).filter(
+            AnalysisHistory.status.in_(["queued", "processing"])
+        ).update({AnalysisHistory.status: "failed"}, synchronize_session=False)
+        db.commit()
+        if stale:
+            print(f"Marked {stale} interrupted analyses as failed")
+    finally:
+        db.close()
+
+
+@app.on_event("startup")
+async def load_models():
+    """Load (and with COMPILE_MODELS, compile) models in the background after startup"""
+    analysis_executor.submit(lambda: (audio_analyzer.model, video_analyzer.model))
+
+
 # ============= AUTHENTICATION ENDPOINTS =============
 
 @app.post("/register", status_code=status.HTTP_201_CREATED)
@@ -133,146 +195,171 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 
 # ============= FILE UPLOAD & ANALYSIS ENDPOINTS =============
 
-@app.post("/upload", response_model=AnalysisResponse)
-async def upload_file(
-    file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    """Upload and analyze media file"""
-    
-    # Validate file type
-    allowed_extensions = [".mp3", ".mp4", ".wav", ".m4a"]
-    file_ext = os.path.splitext(file.filename)[1].lower()
-    
-    if file_ext not in allowed_extensions:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File type not supported. Allowed: {', '.join(allowed_extensions)}"
-        )
-    
-    # Validate file size (max 100MB)
-    file.file.seek(0, 2)
-    file_size = file.file.tell()
-    file.file.seek(0)
-    
-    if file_size > 100 * 1024 * 1024:  # 100MB
-        raise HTTPException(
-            status_code=400,
-            detail="File size exceeds 100MB limit"
-        )
-    
-    # Save file
-    file_path = await save_upload_file(file, UPLOAD_DIR)
-    
-    # Create analysis record
-    analysis = AnalysisHistory(
-        user_id=current_user.id,
-        file_name=file.filename,
-        file_type=file_ext[1:].upper(),
-        file_size=file_size,
-        status="processing"
-    )
-    db.add(analysis)
-    db.commit()
-    db.refresh(analysis)
+def run_analysis(analysis_id: int, file_path: Path, file_ext: str):
+    """Analyze an uploaded file and store the results (runs in the worker pool)"""
+    db = SessionLocal()
+    analysis = None
     
     try:
-        start_time = datetime.utcnow()
+        analysis = db.query(AnalysisHistory).filter(AnalysisHistory.id == analysis_id).first()
+        if analysis is None:
+            return
         
-        # Determine file type and analyze
-        is_video = file_ext in [".mp4"]
+        analysis.status = "processing"
+        db.commit()
         
-        audio_score = None
-        video_score = None
-        anomalies = []
-        spectrogram_path = None
+        start_time = time.perf_counter()
         
-        if is_video:
-            # Extract audio from video
-            audio_data = extract_audio_features(file_path)
-            frames = extract_video_frames(file_path)
-            
-            # Analyze audio
-            audio_result = audio_analyzer.analyze(audio_data)
-            audio_score = audio_result["confidence"]
-            
-            # Analyze video frames
-            video_result = video_analyzer.analyze(frames)
+        # Determine file type
+        is_video = file_ext in VIDEO_EXTENSIONS
+        spectrogram_file = SPECTROGRAMS_DIR / f"{analysis_id}_spectrogram.jpg"
+        
+        # Decode audio and (for video) frames concurrently
+        audio_future = io_executor.submit(extract_audio_features, file_path)
+        frames_future = io_executor.submit(
+            extract_video_frames, file_path, max_frames=VIDEO_SAMPLE_FRAMES
+        ) if is_video else None
+        audio_data = audio_future.result()
+        
+        # Render the spectrogram while the models run
+        spectrogram_future = io_executor.submit(generate_spectrogram, audio_data, spectrogram_file)
+        
+        # Run both analyzers at once; each has its own batching thread, so the
+        # wall time is the slower model rather than their sum. (The frames task
+        # was queued first, so it is never stuck behind the task awaiting it.)
+        video_future = io_executor.submit(
+            lambda: video_analyzer.analyze(frames_future.result())
+        ) if frames_future is not None else None
+        
+        audio_result = audio_analyzer.analyze(audio_data)
+        audio_score = audio_result["confidence"]
+        
+        video_result = None
+        video_score = None
+        if video_future is not None:
+            video_result = video_future.result()
             video_score = video_result["confidence"]
-            
-            # Generate spectrogram
-            spectrogram_path = generate_spectrogram(
-                audio_data, 
-                SPECTROGRAMS_DIR / f"{analysis.id}_spectrogram.png"
-            )
-            
-            # Detect anomalies
-            anomalies = detect_anomalies(audio_result, video_result)
-            
-        else:
-            # Audio only
-            audio_data = extract_audio_features(file_path)
-            audio_result = audio_analyzer.analyze(audio_data)
-            audio_score = audio_result["confidence"]
-            
-            # Generate spectrogram
-            spectrogram_path = generate_spectrogram(
-                audio_data,
-                SPECTROGRAMS_DIR / f"{analysis.id}_spectrogram.png"
-            )
-            
-            # Detect anomalies
-            anomalies = detect_anomalies(audio_result, None)
+        
+        spectrogram_path = spectrogram_future.result()
+        
+        # Detect anomalies
+        anomalies = detect_anomalies(audio_result, video_result)
         
         # Calculate overall truth score
         truth_score = calculate_truth_score(audio_score, video_score)
         
         # Update analysis record
-        end_time = datetime.utcnow()
         analysis.truth_score = truth_score
         analysis.audio_score = audio_score
         analysis.video_score = video_score
         analysis.spectrogram_path = str(spectrogram_path) if spectrogram_path else None
         analysis.anomalies_detected = anomalies
-        analysis.analysis_duration = (end_time - start_time).total_seconds()
+        analysis.analysis_duration = time.perf_counter() - start_time
         analysis.status = "completed"
         
         db.commit()
-        db.refresh(analysis)
-        
-        return AnalysisResponse(
-            id=analysis.id,
-            file_name=analysis.file_name,
-            file_type=analysis.file_type,
-            truth_score=analysis.truth_score,
-            audio_score=analysis.audio_score,
-            video_score=analysis.video_score,
-            anomalies_detected=analysis.anomalies_detected,
-            spectrogram_url=f"/spectrograms/{analysis.id}",
-            analysis_duration=analysis.analysis_duration,
-            status=analysis.status,
-            created_at=analysis.created_at
-        )
         
     except Exception as e:
+        print(f"Analysis {analysis_id} failed: {e}")
+        
         # Update status to failed
-        analysis.status = "failed"
-        db.commit()
+        db.rollback()
+        if analysis is not None:
+            analysis.status = "failed"
+            db.commit()
         
         # Clean up file
         if os.path.exists(file_path):
             os.remove(file_path)
-        
+    
+    finally:
+        db.close()
+
+
+@app.post("/upload", response_model=AnalysisResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_file(
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Upload a media file and queue it for analysis"""
+    
+    # Validate file type
+    file_name = os.path.basename(file.filename)
+    file_ext = os.path.splitext(file_name)[1].lower()
+    
+    if file_ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=UNSUPPORTED_TYPE_DETAIL
+        )
+    
+    # Sniff magic bytes before writing anything to disk
+    header = await file.read(4096)
+    await file.seek(0)
+    
+    if not is_supported_media(header, file_ext):
+        raise HTTPException(
+            status_code=400,
+            detail="File content does not match its extension"
+        )
+    
+    # Save file, aborting once it exceeds the size limit
+    try:
+        file_path, file_size = await save_upload_file(file, UPLOAD_DIR, max_size=MAX_UPLOAD_SIZE)
+    except FileTooLargeError:
         raise HTTPException(
-            status_code=500,
-            detail=f"Analysis failed: {str(e)}"
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="File size exceeds 100MB limit"
         )
+    
+    # Create analysis record
+    analysis = AnalysisHistory(
+        user_id=current_user.id,
+        file_name=file_name,
+        file_type=file_ext[1:].upper(),
+        file_size=file_size,
+        status="queued"
+    )
+    db.add(analysis)
+    db.commit()
+    db.refresh(analysis)
+    
+    # Analyze in the background; the client polls /history/{id}
+    analysis_executor.submit(run_analysis, analysis.id, file_path, file_ext)
+    
+    return AnalysisResponse(
+        id=analysis.id,
+        file_name=analysis.file_name,
+        file_type=analysis.file_type,
+        truth_score=analysis.truth_score,
+        audio_score=analysis.audio_score,
+        video_score=analysis.video_score,
+        anomalies_detected=analysis.anomalies_detected,
+        spectrogram_url=f"/spectrograms/{analysis.id}",
+        analysis_duration=analysis.analysis_duration,
+        status=analysis.status,
+        created_at=analysis.created_at
+    )
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against etag (RFC 9110)"""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
 
 
 @app.get("/spectrograms/{analysis_id}")
 async def get_spectrogram(
     analysis_id: int,
+    request: Request,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -285,10 +372,23 @@ async def get_spectrogram(
     if not analysis or not analysis.spectrogram_path:
         raise HTTPException(status_code=404, detail="Spectrogram not found")
     
-    if not os.path.exists(analysis.spectrogram_path):
+    try:
+        mtime = os.path.getmtime(analysis.spectrogram_path)
+    except OSError:
         raise HTTPException(status_code=404, detail="Spectrogram file not found")
     
-    return FileResponse(analysis.spectrogram_path)
+    # The URL is reused if an id is (SQLite reuses the highest id after a
+    # delete), so clients must revalidate; an unchanged file costs only a 304
+    etag = f'"{analysis.id}-{int(mtime)}"'
+    headers = {
+        "Cache-Control": "private, no-cache",
+        "ETag": etag
+    }
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    
+    return FileResponse(analysis.spectrogram_path, headers=headers)
 
 
 # ============= HISTORY ENDPOINTS =============
@@ -2,7 +2,7 @@
 SQLAlchemy Database Models
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from database import Base
@@ -44,10 +44,15 @@ class AnalysisHistory(Base):
     
     # Metadata
     analysis_duration = Column(Float, nullable=True)  # in seconds
-    status = Column(String(20), default="pending")  # pending, processing, completed, failed
+    status = Column(String(20), default="pending")  # pending, queued, processing, completed, failed
     
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship
-    user = relationship("User", back_populates="analyses")
\ No newline at end of file
+    user = relationship("User", back_populates="analyses")
+    
+    __table_args__ = (
+        # Serves the history listing: WHERE user_id = ? ORDER BY created_at DESC
+        Index("ix_history_user_created", "user_id", "created_at"),
+    )
\ No newline at end of file
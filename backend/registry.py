@@ -0,0 +1,151 @@
+"""
+Model registry - shared device/dtype selection and lazily loaded models
+"""
+
+import os
+import torch
+from functools import lru_cache
+from transformers import (
+    Wav2Vec2Processor,
+    Wav2Vec2ForSequenceClassification,
+    ViTImageProcessor,
+    ViTForImageClassification
+)
+from typing import Tuple
+import warnings
+
+warnings.filterwarnings("ignore")
+
+AUDIO_MODEL_NAME = "facebook/wav2vec2-base-960h"
+VIDEO_MODEL_NAME = "google/vit-base-patch16-224"
+
+# torch.compile(mode="reduce-overhead") instead of TorchScript + manual CUDA graphs
+COMPILE_MODELS = os.getenv("COMPILE_MODELS", "0") == "1"
+
+if COMPILE_MODELS:
+    # One specialization per input bucket; leave room for all of them
+    torch._dynamo.config.cache_size_limit = 64
+
+
+@lru_cache(maxsize=None)
+def get_device() -> torch.device:
+    """Device shared by all models"""
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    if device.type == "cpu":
+        # Use every core for CPU inference
+        torch.set_num_threads(os.cpu_count() or 1)
+    print(f"Models using device: {device}")
+    return device
+
+
+@lru_cache(maxsize=None)
+def get_dtype() -> torch.dtype:
+    """Half precision on GPU, full precision on CPU"""
+    return torch.float16 if get_device().type == "cuda" else torch.float32
+
+
+class LogitsModel(torch.nn.Module):
+    """Wraps a HF classifier so forward takes one input tensor and returns logits"""
+    
+    def __init__(self, model: torch.nn.Module, input_name: str):
+        super().__init__()
+        self.model = model
+        self.input_name = input_name
+    
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.model(**{self.input_name: x}).logits
+
+
+def quantize_for_cpu(model: torch.nn.Module) -> torch.nn.Module:
+    """Dynamically quantize Linear layers to INT8 for CPU inference"""
+    try:
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    except Exception as e:
+        print(f"Warning: Could not quantize model: {e}")
+        return model
+
+
+def script_model(model: torch.nn.Module, example: torch.Tensor, check: torch.Tensor) -> torch.nn.Module:
+    """
+    Trace, freeze and optimize a model for inference with TorchScript
+    
+    Args:
+        model: Model in eval mode taking one input tensor
+        example: Input used for tracing
+        check: Differently shaped input the traced graph must also handle
+        
+    Returns:
+        Optimized ScriptModule, or the eager model if tracing fails
+    """
+    try:
+        with torch.no_grad():
+            traced = torch.jit.trace(model, example)
+            traced = torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+            
+            # Tracing can bake in shapes, so verify against eager on another shape
+            if not torch.allclose(traced(check).float(), model(check).float(), atol=1e-2):
+                raise RuntimeError("traced output does not match eager output")
+        return traced
+    except Exception as e:
+        print(f"Warning: Could not script model: {e}")
+        return model
+
+
+def _prepare(
+    model: torch.nn.Module,
+    input_name: str,
+    example: torch.Tensor,
+    check: torch.Tensor,
+    compile_mode: str = "reduce-overhead",
+    dynamic: bool = False
+):
+    """Move a HF classifier to the shared device/dtype and optimize it for inference"""
+    model.to(get_device(), dtype=get_dtype())
+    model.eval()
+    if get_device().type == "cpu":
+        model = quantize_for_cpu(model)
+    if COMPILE_MODELS:
+        # Compiled lazily per input shape; analyzers bucket and warm the shapes
+        return torch.compile(LogitsModel(model, input_name), mode=compile_mode, dynamic=dynamic)
+    return script_model(LogitsModel(model, input_name), example, check)
+
+
+@lru_cache(maxsize=None)
+def get_audio_model() -> Tuple[Wav2Vec2Processor, torch.nn.Module]:
+    """Wav2Vec2 processor and logits model, loaded once"""
+    processor = Wav2Vec2Processor.from_pretrained(AUDIO_MODEL_NAME)
+    model = Wav2Vec2ForSequenceClassification.from_pretrained(
+        AUDIO_MODEL_NAME,
+        num_labels=2  # Real vs Fake
+    )
+    device, dtype = get_device(), get_dtype()
+    model = _prepare(
+        model,
+        "input_values",
+        torch.randn(1, 16000, device=device, dtype=dtype),
+        torch.randn(1, 24000, device=device, dtype=dtype),
+        # Clip lengths can't be padded (no attention mask), so compile one
+        # length-generic graph and skip CUDA graphs, which are per shape
+        compile_mode="default",
+        dynamic=True
+    )
+    return processor, model
+
+
+@lru_cache(maxsize=None)
+def get_video_model() -> Tuple[ViTImageProcessor, torch.nn.Module]:
+    """ViT image processor and logits model, loaded once"""
+    processor = ViTImageProcessor.from_pretrained(VIDEO_MODEL_NAME)
+    model = ViTForImageClassification.from_pretrained(
+        VIDEO_MODEL_NAME,
+        num_labels=2  # Real vs Fake
+    )
+    device, dtype = get_device(), get_dtype()
+    size = (processor.size["height"], processor.size["width"])
+    model = _prepare(
+        model,
+        "pixel_values",
+        torch.randn(1, 3, *size, device=device, dtype=dtype),
+        torch.randn(2, 3, *size, device=device, dtype=dtype)
+    )
+    return processor, model
\ No newline at end of file
@@ -2,34 +2,97 @@
 Utility functions for file processing, analysis, and reporting
 """
 
+import io
 import os
-import shutil
-import librosa
+import tempfile
+import threading
+import time
+import aiofiles
+from functools import lru_cache
 import numpy as np
-import cv2
+import soundfile as sf
+from math import gcd
+from scipy import fft as sp_fft
+from scipy.signal import resample_poly, stft
 from pathlib import Path
-from typing import List, Dict, Optional
-import matplotlib
-matplotlib.use('Agg')  # Non-interactive backend
-import matplotlib.pyplot as plt
+from typing import Iterator, List, Dict, Optional, Tuple
 from fastapi import UploadFile
 from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.enums import TA_CENTER
 
+# librosa, cv2, matplotlib, reportlab and PIL are imported inside the functions
+# that use them, so workers that only save uploads or score results start fast
 
-async def save_upload_file(upload_file: UploadFile, destination: Path) -> Path:
-    """Save uploaded file to disk"""
-    file_path = destination / f"{datetime.utcnow().timestamp()}_{upload_file.filename}"
+# Spectrograms share one reusable figure, so they are rendered one at a time
+_PLOT_LOCK = threading.Lock()
+_SPEC_FIGURE = None
+
+# Report styles, built on the first report
+_REPORT_STYLES = None
+
+
+class FileTooLargeError(Exception):
+    """Raised when an upload exceeds the allowed size"""
+
+
+def is_supported_media(header: bytes, file_ext: str) -> bool:
+    """
+    Check that a file's leading bytes match its extension
+    
+    Args:
+        header: First bytes of the file (a few KB is plenty)
+        file_ext: Lowercase extension including the dot
+        
+    Returns:
+        True if the signature is a known one for that container
+    """
+    if file_ext == ".wav":
+        return header[:4] == b"RIFF" and header[8:12] == b"WAVE"
+    if file_ext == ".mp3":
+        # ID3 tag, or a bare MPEG audio frame sync
+        return header[:3] == b"ID3" or (
+            len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0
+        )
+    if file_ext in (".mp4", ".m4a"):
+        # ISO base media file: box type follows the 4-byte box size
+        return header[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip")
+    return False
+
+
+async def save_upload_file(
+    upload_file: UploadFile,
+    destination: Path,
+    max_size: Optional[int] = None,
+    chunk_size: int = 1024 * 1024
+) -> Tuple[Path, int]:
+    """
+    Save uploaded file to disk
+    
+    Args:
+        upload_file: Uploaded file
+        destination: Directory to save into
+        max_size: Abort and delete the partial file beyond this many bytes
+        chunk_size: Copy buffer size
+        
+    Returns:
+        Path to saved file and its size in bytes
+    """
+    file_name = os.path.basename(upload_file.filename)
+    file_path = destination / f"{time.time_ns()}_{file_name}"
+    file_size = 0
+    
+    # Async reads and writes keep large uploads from blocking the event loop
+    async with aiofiles.open(file_path, "wb") as buffer:
+        while chunk := await upload_file.read(chunk_size):
+            file_size += len(chunk)
+            if max_size is not None and file_size > max_size:
+                break
+            await buffer.write(chunk)
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(upload_file.file, buffer)
+    if max_size is not None and file_size > max_size:
+        file_path.unlink(missing_ok=True)
+        raise FileTooLargeError(f"Upload exceeds {max_size} bytes")
     
-    return file_path
+    return file_path, file_size
 
 
 def extract_audio_features(file_path: Path) -> np.ndarray:
@@ -43,54 +106,160 @@ def extract_audio_features(file_path: Path) -> np.ndarray:
         numpy array of audio samples
     """
     try:
-        # Load audio file
-        audio, sr = librosa.load(str(file_path), sr=16000, mono=True)
+        try:
+            # libsndfile decodes WAV/FLAC/MP3 directly, without librosa's overhead.
+            # Each 10 s block is mixed down straight into one preallocated mono
+            # buffer, so only a single multi-channel block is ever held at once
+            info = sf.info(str(file_path))
+            sr = info.samplerate
+            audio = np.empty(info.frames, dtype=np.float32)
+            pos = 0
+            for block in sf.blocks(str(file_path), blocksize=sr * 10, dtype='float32', always_2d=True):
+                n = len(block)
+                if pos + n > len(audio):
+                    audio = np.resize(audio, pos + n)  # frame count was an estimate
+                np.mean(block, axis=1, out=audio[pos:pos + n])
+                pos += n
+            audio = audio[:pos]
+            if sr != 16000:
+                factor = gcd(16000, sr)
+                audio = resample_poly(audio, 16000 // factor, sr // factor).astype(np.float32)
+        except Exception:
+            # Containers libsndfile can't read (e.g. MP4/M4A) go through librosa
+            import librosa
+            audio, sr = librosa.load(str(file_path), sr=16000, mono=True)
         return audio
     except Exception as e:
         print(f"Error extracting audio: {e}")
         # Return dummy audio for demonstration
-        return np.random.randn(16000 * 5)  # 5 seconds of random audio
+        return np.zeros(16000 * 5, dtype=np.float32)  # 5 seconds of silence
+
+
+# Opt-in OpenCL (T-API) path for frame resize + colour conversion; only used on
+# a GPU OpenCL device, since CPU runtimes (pocl, Intel CPU ICD) only add copies
+VIDEO_OPENCL = os.getenv("VIDEO_OPENCL", "0") == "1"
 
 
-def extract_video_frames(file_path: Path, max_frames: int = 100) -> List[np.ndarray]:
+@lru_cache(maxsize=None)
+def _use_opencl() -> bool:
+    """Decide once per process whether frames go through cv2.UMat"""
+    if not VIDEO_OPENCL:
+        return False
+    
+    import cv2
+    if not cv2.ocl.haveOpenCL():
+        return False
+    cv2.ocl.setUseOpenCL(True)
+    device = cv2.ocl.Device.getDefault()
+    if not device.type() & cv2.ocl.Device_TYPE_GPU:
+        print(f"Warning: OpenCL device {device.name()} is not a GPU; using CPU frame path")
+        return False
+    return True
+
+
+# Codecs where every frame is a keyframe, so seeking needs no decoder backtracking
+_INTRA_ONLY_FOURCCS = {"MJPG"}
+
+
+def _sample_frames(cap, skip: int, max_frames: int) -> Iterator[np.ndarray]:
+    """
+    Yield every skip-th BGR frame from an open capture, up to max_frames
+    
+    Args:
+        cap: Opened cv2.VideoCapture
+        skip: Distance between sampled frames
+        max_frames: Maximum number of frames to yield
+        
+    Returns:
+        Iterator of decoded frames
+    """
+    import cv2
+    fourcc = (int(cap.get(cv2.CAP_PROP_FOURCC)) & 0xFFFFFFFF).to_bytes(4, "little").decode(errors="ignore")
+    
+    if skip > 1 and fourcc in _INTRA_ONLY_FOURCCS:
+        # Intra-only video: jump straight to each sampled frame
+        for i in range(max_frames):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, i * skip)
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield frame
+        return
+    
+    # Inter-coded video: seeking would backtrack to keyframes, so walk the
+    # stream with grab(), which only advances, and decode just the kept frames
+    frame_count = 0
+    sampled = 0
+    while cap.isOpened() and sampled < max_frames:
+        if not cap.grab():
+            return
+        
+        if frame_count % skip == 0:
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+            yield frame
+            sampled += 1
+        
+        frame_count += 1
+
+
+def extract_video_frames(
+    file_path: Path,
+    max_frames: int = 100,
+    target_size: Optional[Tuple[int, int]] = (224, 224)
+) -> np.ndarray:
     """
     Extract frames from video file
     
     Args:
         file_path: Path to video file
         max_frames: Maximum number of frames to extract
+        target_size: (width, height) to downscale frames to, or None for full size
         
     Returns:
-        List of frames as numpy arrays
+        Frames as one (N, H, W, 3) uint8 RGB array
     """
     try:
-        cap = cv2.VideoCapture(str(file_path))
-        frames = []
-        frame_count = 0
+        import cv2
+        cap = cv2.VideoCapture(str(file_path), cv2.CAP_FFMPEG)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # offline reads gain nothing from prefetch
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        if target_size is not None:
+            width, height = target_size
+        
+        # Decode straight into one contiguous buffer instead of a list of arrays
+        frames = np.empty((max_frames, height, width, 3), dtype=np.uint8)
+        idx = 0
         
         # Calculate frame skip to get evenly distributed frames
         skip = max(1, total_frames // max_frames)
         
-        while cap.isOpened() and len(frames) < max_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_count % skip == 0:
-                # Convert BGR to RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                frames.append(frame_rgb)
-            
-            frame_count += 1
+        use_opencl = _use_opencl()
+        
+        for frame in _sample_frames(cap, skip, max_frames):
+            if use_opencl:
+                umat = cv2.UMat(frame)
+                if target_size is not None:
+                    umat = cv2.resize(umat, target_size, interpolation=cv2.INTER_AREA)
+                frames[idx] = cv2.cvtColor(umat, cv2.COLOR_BGR2RGB).get()
+            else:
+                if target_size is not None:
+                    # Downscale at decode time; the model only sees 224x224
+                    frame = cv2.resize(frame, target_size, interpolation=cv2.INTER_AREA)
+                # Convert BGR to RGB by copying channels reversed into the buffer
+                np.copyto(frames[idx], frame[:, :, ::-1])
+            idx += 1
         
         cap.release()
-        return frames
+        return frames[:idx]
     
     except Exception as e:
         print(f"Error extracting frames: {e}")
         # Return dummy frames for demonstration
-        return [np.random.randint(0, 255, (224, 224, 3), dtype=np.uint8) for _ in range(10)]
+        return np.zeros((10, 224, 224, 3), dtype=np.uint8)
 
 
 def generate_spectrogram(audio: np.ndarray, output_path: Path) -> Path:
@@ -104,50 +273,123 @@ def generate_spectrogram(audio: np.ndarray, output_path: Path) -> Path:
     Returns:
         Path to saved spectrogram
     """
+    with _PLOT_LOCK:
+        return _render_spectrogram(audio, output_path)
+
+
+def _get_spectrogram_figure():
+    """Create the shared spectrogram figure on first use (caller holds _PLOT_LOCK)"""
+    global _SPEC_FIGURE
+    if _SPEC_FIGURE is None:
+        import matplotlib
+        matplotlib.use('Agg')  # Non-interactive backend
+        # Settle text/path settings once so per-render font lookups stay cached
+        matplotlib.rcParams.update({
+            'text.usetex': False,
+            'font.family': 'DejaVu Sans',
+            'axes.unicode_minus': False,
+            'path.simplify': True,
+            'path.simplify_threshold': 1.0,
+        })
+        from matplotlib.figure import Figure
+        
+        fig = Figure(figsize=(12, 6))
+        ax, cax = fig.subplots(1, 2, gridspec_kw={'width_ratios': [40, 1]})
+        # Fixed margins instead of tight_layout(), which re-measures every artist
+        fig.subplots_adjust(left=0.08, right=0.93, top=0.93, bottom=0.1, wspace=0.03)
+        _SPEC_FIGURE = (fig, ax, cax)
+    return _SPEC_FIGURE
+
+
+def _draw_spectrogram(
+    data: np.ndarray,
+    output_path: Path,
+    extent=None,
+    colorbar_format=None,
+    vmin=None,
+    vmax=None
+):
+    """Draw data onto the shared figure and save it (caller holds _PLOT_LOCK)"""
+    fig, ax, cax = _get_spectrogram_figure()
+    ax.clear()
+    cax.clear()
+    
+    image = ax.imshow(
+        data, aspect='auto', origin='lower', extent=extent, cmap='viridis', vmin=vmin, vmax=vmax
+    )
+    fig.colorbar(image, cax=cax, format=colorbar_format)
+    ax.set_title('Frequency Spectrogram Analysis')
+    ax.set_xlabel('Time (s)')
+    ax.set_ylabel('Frequency (Hz)')
+    
+    # A colormap plot doesn't need lossless PNG; JPEG encodes faster and smaller
+    fig.savefig(str(output_path), format='jpg', dpi=150, pil_kwargs={'quality': 85})
+    return output_path
+
+
+def _render_spectrogram(audio: np.ndarray, output_path: Path) -> Path:
+    """Render the spectrogram figure (caller holds _PLOT_LOCK)"""
     try:
-        plt.figure(figsize=(12, 6))
+        # Compute spectrogram (one-sided real FFT, 2048-sample frames, hop 512).
+        # Unlike librosa.stft, frames are not centred (no n_fft/2 edge padding).
+        # float32 input keeps the whole path in complex64/float32
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.size < 2048:
+            # Clips shorter than one frame still get a (single-column) spectrogram
+            audio = np.pad(audio, (0, 2048 - audio.size))
+        with sp_fft.set_workers(-1):
+            f, t, Zxx = stft(audio, fs=16000, nperseg=2048, noverlap=1536, padded=False, boundary=None)
         
-        # Compute spectrogram
-        D = librosa.amplitude_to_db(
-            np.abs(librosa.stft(audio)),
-            ref=np.max
-        )
+        # Convert to dB relative to the peak, in place in a single float32 buffer
+        D = np.abs(Zxx, out=np.empty(Zxx.shape, dtype=np.float32))
+        np.maximum(D, 1e-10, out=D)
+        np.log10(D, out=D)
+        D *= 20.0
+        D -= D.max()
         
         # Plot spectrogram
-        librosa.display.specshow(
+        return _draw_spectrogram(
             D,
-            sr=16000,
-            x_axis='time',
-            y_axis='hz',
-            cmap='viridis'
+            output_path,
+            extent=[t[0], t[-1], f[0], f[-1]],
+            colorbar_format='%+2.0f dB',
+            vmin=-80,  # amplitude_to_db's top_db floor; fixed limits skip a data scan
+            vmax=0
         )
-        
-        plt.colorbar(format='%+2.0f dB')
-        plt.title('Frequency Spectrogram Analysis')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Frequency (Hz)')
-        plt.tight_layout()
-        
-        # Save figure
-        plt.savefig(str(output_path), dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return output_path
     
     except Exception as e:
         print(f"Error generating spectrogram: {e}")
         
         # Generate dummy spectrogram
-        plt.figure(figsize=(12, 6))
-        plt.imshow(np.random.rand(100, 100), cmap='viridis', aspect='auto')
-        plt.colorbar()
-        plt.title('Frequency Spectrogram Analysis')
-        plt.xlabel('Time (s)')
-        plt.ylabel('Frequency (Hz)')
-        plt.savefig(str(output_path), dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return output_path
+        return _draw_spectrogram(np.random.rand(100, 100), output_path)
+
+
+# Confidence below these marks a high / medium severity anomaly
+_HIGH_THRESHOLD = 40
+_MEDIUM_THRESHOLD = 60
+
+# Per modality, in (audio, video) order:
+# (type, high description, medium description, feature, feature threshold, feature type, feature description)
+_ANOMALY_RULES = (
+    (
+        "audio",
+        "Significant audio manipulation detected",
+        "Possible audio inconsistencies detected",
+        "spectral_consistency",
+        50,
+        "audio_spectral",
+        "Unusual frequency patterns detected",
+    ),
+    (
+        "video",
+        "Significant video manipulation detected",
+        "Possible video inconsistencies detected",
+        "temporal_coherence",
+        55,
+        "video_temporal",
+        "Frame-to-frame inconsistencies detected",
+    ),
+)
 
 
 def detect_anomalies(
@@ -166,60 +408,36 @@ def detect_anomalies(
     """
     anomalies = []
     
-    if audio_result:
-        confidence = audio_result.get("confidence", 50)
+    for (kind, high_desc, medium_desc, feature, feature_threshold, feature_kind, feature_desc), result in zip(
+        _ANOMALY_RULES, (audio_result, video_result)
+    ):
+        if not result:
+            continue
         
-        if confidence < 40:
+        confidence = result.get("confidence", 50)
+        if confidence < _HIGH_THRESHOLD:
             anomalies.append({
-                "type": "audio",
+                "type": kind,
                 "severity": "high",
-                "description": "Significant audio manipulation detected",
+                "description": high_desc,
                 "confidence": confidence
             })
-        elif confidence < 60:
+        elif confidence < _MEDIUM_THRESHOLD:
             anomalies.append({
-                "type": "audio",
+                "type": kind,
                 "severity": "medium",
-                "description": "Possible audio inconsistencies detected",
+                "description": medium_desc,
                 "confidence": confidence
             })
         
-        # Check spectral features
-        features = audio_result.get("features", {})
-        if features.get("spectral_consistency", 100) < 50:
+        # Check the modality's feature score
+        score = result.get("features", {}).get(feature, 100)
+        if score < feature_threshold:
             anomalies.append({
-                "type": "audio_spectral",
+                "type": feature_kind,
                 "severity": "medium",
-                "description": "Unusual frequency patterns detected",
-                "confidence": features["spectral_consistency"]
-            })
-    
-    if video_result:
-        confidence = video_result.get("confidence", 50)
-        
-        if confidence < 40:
-            anomalies.append({
-                "type": "video",
-                "severity": "high",
-                "description": "Significant video manipulation detected",
-                "confidence": confidence
-            })
-        elif confidence < 60:
-            anomalies.append({
-                "type": "video",
-                "severity": "medium",
-                "description": "Possible video inconsistencies detected",
-                "confidence": confidence
-            })
-        
-        # Check temporal coherence
-        features = video_result.get("features", {})
-        if features.get("temporal_coherence", 100) < 55:
-            anomalies.append({
-                "type": "video_temporal",
-                "severity": "medium",
-                "description": "Frame-to-frame inconsistencies detected",
-                "confidence": features["temporal_coherence"]
+                "description": feature_desc,
+                "confidence": score
             })
     
     return anomalies
@@ -250,6 +468,50 @@ def calculate_truth_score(
         return 50.0  # Default neutral score
 
 
+def _get_report_styles():
+    """Build the report styles on first use and reuse them for every report"""
+    global _REPORT_STYLES
+    if _REPORT_STYLES is None:
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import TableStyle
+        
+        styles = getSampleStyleSheet()
+        
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#1976d2'),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        )
+        
+        info_table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.grey),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (1, 0), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+        
+        # The verdict colour is appended per report
+        results_table_commands = [
+            ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 14),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]
+        
+        _REPORT_STYLES = (styles, title_style, info_table_style, results_table_commands)
+    return _REPORT_STYLES
+
+
 def generate_pdf_report(analysis, user) -> Path:
     """
     Generate PDF report for analysis
@@ -261,12 +523,21 @@ def generate_pdf_report(analysis, user) -> Path:
     Returns:
         Path to generated PDF
     """
+    from PIL import Image as PILImage
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+    
+    styles, title_style, info_table_style, results_table_commands = _get_report_styles()
+    
     pdf_path = Path(f"reports/report_{analysis.id}.pdf")
     pdf_path.parent.mkdir(exist_ok=True)
     
-    # Create PDF
+    # Build in memory so a half-written report is never visible at pdf_path
+    buffer = io.BytesIO()
     doc = SimpleDocTemplate(
-        str(pdf_path),
+        buffer,
         pagesize=letter,
         rightMargin=72,
         leftMargin=72,
@@ -276,41 +547,22 @@ def generate_pdf_report(analysis, user) -> Path:
     
     # Container for PDF elements
     story = []
-    styles = getSampleStyleSheet()
     
     # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#1976d2'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    
     story.append(Paragraph("Echo-Check Analysis Report", title_style))
     story.append(Spacer(1, 12))
     
     # Report info
     data = [
-        ['Report Generated:', datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')],
+        ['Report Generated:', datetime.utcnow().isoformat(sep=' ', timespec='seconds') + ' UTC'],
         ['User:', user.username],
         ['File Name:', analysis.file_name],
         ['File Type:', analysis.file_type],
-        ['Analysis Date:', analysis.created_at.strftime('%Y-%m-%d %H:%M:%S')],
+        ['Analysis Date:', analysis.created_at.isoformat(sep=' ', timespec='seconds')],
     ]
     
     table = Table(data, colWidths=[2*inch, 4*inch])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.grey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 12),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (1, 0), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    table.setStyle(info_table_style)
     
     story.append(table)
     story.append(Spacer(1, 24))
@@ -342,14 +594,9 @@ def generate_pdf_report(analysis, user) -> Path:
         results_data.append(['Video Score:', f"{analysis.video_score:.1f}%"])
     
     results_table = Table(results_data, colWidths=[2*inch, 4*inch])
-    results_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 14),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('TEXTCOLOR', (1, 1), (1, 1), verdict_color),
-    ]))
+    results_table.setStyle(TableStyle(
+        results_table_commands + [('TEXTCOLOR', (1, 1), (1, 1), verdict_color)]
+    ))
     
     story.append(results_table)
     story.append(Spacer(1, 24))
@@ -370,10 +617,25 @@ def generate_pdf_report(analysis, user) -> Path:
         story.append(Paragraph("Frequency Spectrogram", styles['Heading2']))
         story.append(Spacer(1, 12))
         
-        img = Image(analysis.spectrogram_path, width=6*inch, height=3*inch)
+        # Downsize to the printed size (6x3 in at 150 dpi) so only those pixels are embedded
+        with PILImage.open(analysis.spectrogram_path) as spectrogram:
+            spectrogram.thumbnail((900, 450), PILImage.LANCZOS)
+            image_buffer = io.BytesIO()
+            # Spectrograms from before the switch to JPEG are RGBA PNGs
+            spectrogram.convert('RGB').save(image_buffer, 'JPEG', quality=85)
+        image_buffer.seek(0)
+        img = Image(image_buffer, width=6*inch, height=3*inch)
         story.append(img)
     
-    # Build PDF
+    # Build PDF, then swap it into place atomically
     doc.build(story)
+    fd, tmp_path = tempfile.mkstemp(dir=pdf_path.parent, suffix=".tmp")  # unique across processes
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(buffer.getvalue())
+        os.replace(tmp_path, pdf_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
     
     return pdf_path
\ No newline at end of file
@@ -13,6 +13,14 @@ export default function Results({ token }) {
     fetchAnalysis();
   }, [id]);
 
+  // Poll until the background analysis finishes
+  useEffect(() => {
+    if (!analysis || !['queued', 'processing'].includes(analysis.status)) return;
+
+    const timer = setTimeout(fetchAnalysis, 2000);
+    return () => clearTimeout(timer);
+  }, [analysis]);
+
   const fetchAnalysis = async () => {
     try {
       const response = await fetch(`http://localhost:8000/history/${id}`, {
@@ -24,6 +32,9 @@ export default function Results({ token }) {
       if (response.ok) {
         const data = await response.json();
         setAnalysis(data);
+        if (data.status === 'failed') {
+          toast.error('Analysis failed');
+        }
       } else {
         toast.error('Failed to load analysis');
         navigate('/history');
@@ -74,6 +85,15 @@ export default function Results({ token }) {
     return null;
   }
 
+  if (['queued', 'processing'].includes(analysis.status)) {
+    return (
+      <div className="flex flex-col items-center justify-center min-h-screen">
+        <Loader className="w-12 h-12 animate-spin text-blue-600" />
+        <p className="mt-4 text-gray-600 capitalize">{analysis.status}...</p>
+      </div>
+    );
+  }
+
   const truthScore = analysis.truth_score || 50;
   const getScoreColor = (score) => {
     if (score >= 70) return 'text-green-600';
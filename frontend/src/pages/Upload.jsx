@@ -74,7 +74,7 @@ export default function Upload({ token }) {
 
       if (response.ok) {
         const data = await response.json();
-        toast.success('Analysis completed successfully!');
+        toast.success('Upload complete. Analyzing...');
         setTimeout(() => {
           navigate(`/results/${data.id}`);
         }, 500);